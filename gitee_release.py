@@ -13,7 +13,8 @@ from functools import wraps
 import requests
 from requests_toolbelt import MultipartEncoder, MultipartEncoderMonitor
 from tqdm import tqdm
-from tqdm.contrib.logging import logging_redirect_tqdm
+
+from transfer_tuner import is_congestion_status
 
 # 从环境变量中获取重试次数，默认为0（不重试）
 gitee_upload_retry_times = os.environ.get("gitee_upload_retry_times", "0")
@@ -130,18 +131,20 @@ class Gitee:
     提供与 Gitee 平台交互的方法
     """
     
-    def __init__(self, owner, token):
+    def __init__(self, owner, token, transfer_tuner=None):
         """
         初始化 Gitee 客户端
         
         Args:
             owner (str): 仓库所有者
             token (str): Gitee 访问令牌
+            transfer_tuner (TransferTuner): 传输参数调节器，为空时使用默认读取大小
         """
         self.owner = owner
         self.token = token
+        self.transfer_tuner = transfer_tuner
 
-    def create_release(self, repo, tag_name, name, body='-', target_commitish='master'):
+    def create_release(self, repo, tag_name, name, body='-', target_commitish='master', prerelease=False):
         """
         在 Gitee 仓库中创建一个新的 Release
         
@@ -151,6 +154,7 @@ class Gitee:
             name (str): Release 名称
             body (str): Release 描述信息
             target_commitish (str): 目标提交分支或 SHA 值
+            prerelease (bool): 是否为预览版本
         
         Returns:
             tuple: (success, result) 
@@ -164,6 +168,7 @@ class Gitee:
             'name': name,
             'body': body,
             'target_commitish': target_commitish,
+            'prerelease': 'true' if prerelease else 'false',
         }
         response = requests.post(url, data=data)
         response_data = response.json()
@@ -179,6 +184,106 @@ class Gitee:
         else:
             return False, "响应中未包含 'id' 字段"
 
+    def update_release(self, repo, release_id, tag_name, changed_fields):
+        """
+        更新 Gitee 仓库中已存在的 Release
+        
+        Args:
+            repo (str): 仓库名称
+            release_id (str): Release ID
+            tag_name (str): 标签名称
+            changed_fields (dict): 需要更新的字段，可包含 name、body、prerelease
+        
+        Returns:
+            tuple: (success, result)
+                   - success (bool): 是否成功
+                   - result (str): 成功时为 Release ID，失败时为错误信息
+        """
+        url = f'https://gitee.com/api/v5/repos/{self.owner}/{repo}/releases/{release_id}'
+        data = {
+            'access_token': self.token,
+            'tag_name': tag_name,
+        }
+        for field, value in changed_fields.items():
+            data[field] = ('true' if value else 'false') if isinstance(value, bool) else value
+        response = requests.patch(url, data=data)
+        response_data = response.json()
+        
+        # 检查响应状态码是否表示成功（HTTP 2xx）
+        if response.status_code < 200 or response.status_code > 300:
+            error_message = response_data["message"] if "message" in response_data else f"响应状态码: {response.status_code}"
+            return False, error_message
+
+        # 检查响应中是否包含 ID 字段
+        if "id" in response_data:
+            return True, response_data["id"]
+        else:
+            return False, "响应中未包含 'id' 字段"
+
+    def list_assets(self, repo, release_id):
+        """
+        获取 Release 中已上传的附件列表（不包含自动生成的源码压缩包）
+        
+        Args:
+            repo (str): 仓库名称
+            release_id (str): Release ID
+        
+        Returns:
+            tuple: (success, result)
+                   - success (bool): 是否成功
+                   - result (list or str): 成功时为附件列表，失败时为错误信息
+        """
+        url = f'https://gitee.com/api/v5/repos/{self.owner}/{repo}/releases/{release_id}/attach_files'
+        attach_files = []
+        page = 1
+        while True:
+            response = requests.get(url, params={'access_token': self.token, 'page': page, 'per_page': 100})
+            # 网关错误等情况下响应体可能不是 JSON
+            try:
+                response_data = response.json()
+            except ValueError:
+                return False, f"响应状态码: {response.status_code}"
+            
+            # 检查响应状态码是否表示成功（HTTP 2xx）
+            if response.status_code < 200 or response.status_code > 300:
+                error_message = response_data["message"] if isinstance(response_data, dict) and "message" in response_data \
+                    else f"响应状态码: {response.status_code}"
+                return False, error_message
+            if not isinstance(response_data, list):
+                return False, "响应不是附件列表"
+            
+            attach_files.extend(response_data)
+            if len(response_data) < 100:
+                return True, attach_files
+            page += 1
+
+    def delete_asset(self, repo, release_id, attach_file_id):
+        """
+        删除 Release 中的附件
+        
+        Args:
+            repo (str): 仓库名称
+            release_id (str): Release ID
+            attach_file_id (str): 附件 ID
+        
+        Returns:
+            tuple: (success, result)
+                   - success (bool): 是否成功
+                   - result (str): 成功时为附件 ID，失败时为错误信息
+        """
+        url = f'https://gitee.com/api/v5/repos/{self.owner}/{repo}/releases/{release_id}/attach_files/{attach_file_id}'
+        response = requests.delete(url, params={'access_token': self.token})
+        
+        # 检查响应状态码是否表示成功（HTTP 2xx），删除成功时响应体为空
+        if response.status_code < 200 or response.status_code > 300:
+            try:
+                response_data = response.json()
+            except ValueError:
+                response_data = {}
+            error_message = response_data["message"] if "message" in response_data else f"响应状态码: {response.status_code}"
+            return False, error_message
+        return True, attach_file_id
+
     @retry_decorator(retry_times)
     def upload_asset(self, repo, release_id, files=None, file_name=None, file_path=None):
         """
@@ -219,26 +324,46 @@ class Gitee:
             
         multipart_encoder = MultipartEncoder(fields=fields)
         url = f"https://gitee.com/api/v5/repos/{self.owner}/{repo}/releases/{release_id}/attach_files"
+        # 由调节器决定每次从编码器读取的字节数
+        read_size = self.transfer_tuner.chunk_size('upload') if self.transfer_tuner else None
         
-        # 创建带进度条的上传包装器
-        with logging_redirect_tqdm():
-            with tqdm(total=multipart_encoder.len, unit='B', unit_scale=True, desc=f"上传 {file_name}") as pbar:
-                class ProgressAdapter:
-                    def __init__(self, encoder, progress_bar):
-                        self.encoder = encoder
-                        self.progress_bar = progress_bar
-                        self.monitor = MultipartEncoderMonitor(encoder, self.update_progress)
-                    
-                    def update_progress(self, monitor):
-                        progress = monitor.bytes_read
-                        self.progress_bar.update(progress - self.progress_bar.n)
-                    
-                    def __getattr__(self, item):
-                        return getattr(self.monitor, item)
+        # 创建带进度条的上传包装器（日志重定向由调用方在主线程中统一设置）
+        with tqdm(total=multipart_encoder.len, unit='B', unit_scale=True, desc=f"上传 {file_name}") as pbar:
+            class ProgressAdapter:
+                def __init__(self, encoder, progress_bar):
+                    self.encoder = encoder
+                    self.progress_bar = progress_bar
+                    self.monitor = MultipartEncoderMonitor(encoder, self.update_progress)
                 
-                progress_monitor = ProgressAdapter(multipart_encoder, pbar)
+                def update_progress(self, monitor):
+                    progress = monitor.bytes_read
+                    self.progress_bar.update(progress - self.progress_bar.n)
+                
+                def read(self, size=-1):
+                    return self.monitor.read(read_size or size)
+                
+                def __getattr__(self, item):
+                    return getattr(self.monitor, item)
+            
+            progress_monitor = ProgressAdapter(multipart_encoder, pbar)
+            # 测量本次上传的吞吐量及期间的并发数
+            measurement = self.transfer_tuner.begin('upload') if self.transfer_tuner else None
+            try:
                 response = requests.post(url, data=progress_monitor,
                                          headers={'Content-Type': multipart_encoder.content_type})
+                if measurement:
+                    if 200 <= response.status_code <= 300:
+                        measurement.finish(multipart_encoder.len)
+                    elif is_congestion_status(response.status_code):
+                        # 只有服务端过载或限流才视为拥塞，鉴权失败等错误不影响传输参数
+                        measurement.fail()
+            except requests.exceptions.RequestException:
+                if measurement:
+                    measurement.fail()
+                raise
+            finally:
+                if measurement:
+                    measurement.close()
         response_data = response.json()
         
         # 检查响应状态码是否表示成功（HTTP 2xx）
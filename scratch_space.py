@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# coding:utf-8
+"""
+临时存储空间管理模块
+在可配置的临时目录下存放下载的附件，按字节预算限制磁盘占用，
+附件上传完成后立即删除，使磁盘峰值占用与 Release 数量无关
+"""
+
+import os
+import shutil
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ScratchSpace:
+    """
+    临时存储空间管理器
+    下载前通过 reserve 预占空间，预算不足时阻塞等待；上传结束后通过 release 删除文件并归还空间
+    """
+
+    def __init__(self, root=None, budget_bytes=0):
+        """
+        在指定目录下创建本次运行专用的临时目录
+
+        Args:
+            root (str): 临时目录的父目录，为空时使用 RUNNER_TEMP 或系统临时目录
+            budget_bytes (int): 磁盘占用预算（字节），小于等于 0 表示不限制
+        """
+        root = root or os.environ.get('RUNNER_TEMP') or None
+        if root:
+            os.makedirs(root, exist_ok=True)
+        self.root = tempfile.mkdtemp(prefix='sync-action-', dir=root)
+        self.budget_bytes = max(0, budget_bytes)
+        self.used_bytes = 0
+        self.peak_bytes = 0
+        self._condition = threading.Condition()
+
+    def directory(self, name):
+        """
+        获取临时目录下的子目录，不存在时创建
+
+        Args:
+            name (str): 子目录名称
+
+        Returns:
+            str: 子目录完整路径
+        """
+        directory_path = os.path.join(self.root, name)
+        os.makedirs(directory_path, exist_ok=True)
+        return directory_path
+
+    def reserve(self, size):
+        """
+        预占磁盘空间，超出预算时阻塞直到其他文件释放空间
+        单个文件超过预算时，等待其他文件全部释放后再放行，避免永久阻塞
+
+        Args:
+            size (int): 预占字节数
+        """
+        with self._condition:
+            if self.budget_bytes:
+                while self.used_bytes > 0 and self.used_bytes + size > self.budget_bytes:
+                    self._condition.wait()
+            self.used_bytes += size
+            self.peak_bytes = max(self.peak_bytes, self.used_bytes)
+
+    def release(self, file_path, size):
+        """
+        删除文件并归还预占的空间
+
+        Args:
+            file_path (str): 文件路径
+            size (int): 预占时的字节数
+        """
+        try:
+            if file_path and os.path.isfile(file_path):
+                os.remove(file_path)
+        except OSError as e:
+            logger.warning('删除临时文件 %s 失败: %s', file_path, e)
+        with self._condition:
+            self.used_bytes = max(0, self.used_bytes - size)
+            self._condition.notify_all()
+
+    def cleanup(self):
+        """
+        删除本次运行创建的临时目录
+        """
+        shutil.rmtree(self.root, ignore_errors=True)
+        logger.info('临时目录 %s 已清理，磁盘峰值占用 %s 字节', self.root, self.peak_bytes)
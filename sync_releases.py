@@ -1,13 +1,18 @@
 import glob
+import hashlib
+import json
 import os
 import ssl
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
 
 import requests
 from tqdm import tqdm
 from tqdm.contrib.logging import logging_redirect_tqdm
 
 from gitee_release import Gitee, get_environment_variable, set_action_output
+from transfer_tuner import TransferTuner, DEFAULT_CHUNK_SIZE, DEFAULT_MAX_WORKERS, is_congestion_status
+from scratch_space import ScratchSpace
 
 
 # GitHub Releases API 基础 URL
@@ -164,32 +169,31 @@ def upload_release_assets(asset_files, gitee_client, gitee_repository, gitee_rel
             
         all_files.extend(matched_files)
     
-    # 使用 tqdm 显示上传进度
-    with logging_redirect_tqdm():
-        for file_path in tqdm(all_files, desc="上传文件", unit="file"):
-            # 跳过已上传的文件和目录
-            if file_path in uploaded_file_paths or os.path.isdir(file_path):
-                continue
-        
-        # 上传单个文件
-        success, message = gitee_client.upload_asset(
-            gitee_repository, 
-            gitee_release_id,
-            file_name=os.path.basename(file_path), 
-            file_path=file_path
-        )
-        
-        if not success:
-            raise Exception("上传文件附件失败: " + message)
-            
-        upload_results.append(message)
-        uploaded_file_paths.add(file_path)
+    # 使用 tqdm 显示上传进度（日志重定向由调用方在主线程中统一设置）
+    for file_path in tqdm(all_files, desc="上传文件", unit="file"):
+        # 跳过已上传的文件和目录
+        if file_path in uploaded_file_paths or os.path.isdir(file_path):
+            continue
+    
+    # 上传单个文件
+    success, message = gitee_client.upload_asset(
+        gitee_repository, 
+        gitee_release_id,
+        file_name=os.path.basename(file_path), 
+        file_path=file_path
+    )
+    
+    if not success:
+        raise Exception("上传文件附件失败: " + message)
         
+    upload_results.append(message)
+    uploaded_file_paths.add(file_path)
+    
     return upload_results
 
 
 def create_gitee_release(gitee_owner, gitee_token, gitee_repository, 
-                         release_tag_name, release_name, release_body, target_commitish):
+                         release_tag_name, release_name, release_body, target_commitish, prerelease=False):
     """
     在 Gitee 上创建新的 Release
     
@@ -201,6 +205,7 @@ def create_gitee_release(gitee_owner, gitee_token, gitee_repository,
         release_name (str): Release 名称
         release_body (str): Release 描述
         target_commitish (str): 目标提交标识
+        prerelease (bool): 是否为预览版本
     
     Returns:
         str or None: 创建成功的 Release ID，失败则返回 None
@@ -211,7 +216,8 @@ def create_gitee_release(gitee_owner, gitee_token, gitee_repository,
         tag_name=release_tag_name, 
         name=release_name,
         body=release_body, 
-        target_commitish=target_commitish
+        target_commitish=target_commitish,
+        prerelease=prerelease
     )
     
     if success:
@@ -223,7 +229,7 @@ def create_gitee_release(gitee_owner, gitee_token, gitee_repository,
         return None
 
 
-def download_file_from_url(url, local_directory, filename):
+def download_file_from_url(url, local_directory, filename, transfer_tuner=None):
     """
     从 URL 下载文件到本地
     
@@ -231,17 +237,20 @@ def download_file_from_url(url, local_directory, filename):
         url (str): 文件下载地址
         local_directory (str): 本地存储目录
         filename (str): 保存的文件名
+        transfer_tuner (TransferTuner): 传输参数调节器，为空时使用默认分块大小
     
     Returns:
         str or None: 下载成功返回文件路径，失败返回 None
     """
+    chunk_size = transfer_tuner.chunk_size('download') if transfer_tuner else DEFAULT_CHUNK_SIZE
+    # 测量本次下载的吞吐量及期间的并发数
+    measurement = transfer_tuner.begin('download') if transfer_tuner else None
     try:
         # 构建完整的本地目录路径
         full_directory_path = os.path.join(os.getcwd(), local_directory)
         
-        # 如果目录不存在则创建
-        if not os.path.exists(full_directory_path):
-            os.mkdir(full_directory_path)
+        # 如果目录不存在则创建（并发下载时目录可能已被其他线程创建）
+        os.makedirs(full_directory_path, exist_ok=True)
             
         # 构建完整的文件路径
         full_file_path = os.path.join(full_directory_path, filename)
@@ -254,26 +263,37 @@ def download_file_from_url(url, local_directory, filename):
         if response.status_code == 200:
             # 获取文件总大小
             total_size = int(response.headers.get('content-length', 0))
+            downloaded_size = 0
             
             # 打开本地文件进行写入
             with open(full_file_path, 'wb') as file_handle:
-                # 使用 tqdm 显示进度条
-                with logging_redirect_tqdm():
-                    with tqdm(total=total_size, unit='B', unit_scale=True, desc=filename) as pbar:
-                        # 分块读取文件内容，每次读取 1KB
-                        for data_chunk in response.iter_content(chunk_size=1024):
-                            if data_chunk:  # 确保有数据可写入
-                                file_handle.write(data_chunk)  # 将数据块写入本地文件
-                                file_handle.flush()  # 刷新缓冲区，确保数据写入磁盘
-                                pbar.update(len(data_chunk))  # 更新进度条
+                # 使用 tqdm 显示进度条（日志重定向由调用方在主线程中统一设置）
+                with tqdm(total=total_size, unit='B', unit_scale=True, desc=filename) as pbar:
+                    # 按调节器给出的分块大小读取文件内容
+                    for data_chunk in response.iter_content(chunk_size=chunk_size):
+                        if data_chunk:  # 确保有数据可写入
+                            file_handle.write(data_chunk)  # 将数据块写入本地文件
+                            downloaded_size += len(data_chunk)
+                            pbar.update(len(data_chunk))  # 更新进度条
+            if measurement:
+                measurement.finish(downloaded_size)
             logger.info(f'文件 {filename} 下载完成！')
             return full_file_path
         else:
             logger.error('下载失败，状态码：%s', response.status_code)
+            # 只有服务端过载或限流才视为拥塞，附件不存在等错误不影响传输参数
+            if measurement and is_congestion_status(response.status_code):
+                measurement.fail()
     except requests.exceptions.RequestException as e:  # 处理网络连接问题和其他HTTP请求错误
         logger.error('请求错误：%s', str(e))
+        if measurement:
+            measurement.fail()
     except FileNotFoundError as e:  # 处理文件写入错误
         logger.error('文件写入错误：%s', str(e))
+    finally:
+        # 未上报结果的测量（如附件不存在）只结束计数
+        if measurement:
+            measurement.close()
     return None
 
 
@@ -289,6 +309,11 @@ def sync_github_releases_to_gitee():
     gitee_repo = get_environment_variable('gitee_repo')
     github_owner = get_environment_variable('github_owner')
     github_repo = get_environment_variable('github_repo')
+    tuning_state_file = get_environment_variable('transfer_tuning_file', '')
+    max_workers = get_environment_variable('transfer_max_workers', str(DEFAULT_MAX_WORKERS))
+    scratch_dir = get_environment_variable('scratch_dir', '')
+    scratch_budget_mb = get_environment_variable('scratch_budget_mb', '2048')
+    prune_stale_assets = get_environment_variable('prune_stale_assets', 'false').lower() == 'true'
     
     # 验证必要配置是否存在
     if gitee_owner is None:
@@ -316,63 +341,252 @@ def sync_github_releases_to_gitee():
     
     tqdm.write(f"获取到 {len(github_releases)} 个 GitHub Release 和 {len(gitee_releases)} 个 Gitee Release")
     
+    # 创建传输参数调节器，加载上次运行学习到的参数
+    try:
+        max_workers = int(max_workers)
+    except ValueError:
+        max_workers = DEFAULT_MAX_WORKERS
+    transfer_tuner = TransferTuner(tuning_state_file, max_workers)
+    tqdm.write(f"初始传输参数:\n{transfer_tuner.report()}")
+    
     # 创建 Gitee 客户端实例
-    gitee_client = Gitee(gitee_owner, gitee_token)
+    gitee_client = Gitee(gitee_owner, gitee_token, transfer_tuner)
     
-    # 使用 tqdm 显示同步进度
-    with logging_redirect_tqdm():
-        for github_release in tqdm(github_releases, desc="同步 Releases", unit="release"):
-            # 跳过没有 tag_name 的 Release
-            if 'tag_name' not in github_release:
-                continue
+    # 创建临时存储空间，附件上传后立即删除
+    try:
+        scratch_budget_bytes = int(scratch_budget_mb) * 1024 * 1024
+    except ValueError:
+        scratch_budget_bytes = 0
+    scratch_space = ScratchSpace(scratch_dir, scratch_budget_bytes)
+    tqdm.write(f"附件临时目录: {scratch_space.root}，磁盘预算: {scratch_budget_bytes or '不限'} 字节")
+    
+    try:
+        # 使用 tqdm 显示同步进度
+        with logging_redirect_tqdm():
+            for github_release in tqdm(github_releases, desc="同步 Releases", unit="release"):
+                # 跳过没有 tag_name 的 Release
+                if 'tag_name' not in github_release:
+                    continue
                 
-            release_tag_name = github_release['tag_name']
-            tqdm.write(f'准备同步 {github_request_url} , 标签为 {release_tag_name}')
+                release_tag_name = github_release['tag_name']
+                tqdm.write(f'准备同步 {github_request_url} , 标签为 {release_tag_name}')
             
-            github_release_id = github_release['id']
-            # 获取 GitHub Release 的详细信息和附件
-            github_release_info, github_release_assets, github_release_url = fetch_github_release_details(
-                github_owner, github_repo, github_release_id)
+                github_release_id = github_release['id']
+                # 获取 GitHub Release 的详细信息和附件
+                github_release_info, github_release_assets, github_release_url = fetch_github_release_details(
+                    github_owner, github_repo, github_release_id)
                 
-            # 如果 Gitee 上已存在相同标签的 Release，则只同步附件
-            if release_tag_name in gitee_releases:
-                tqdm.write(f'Release {release_tag_name} 已存在，仅同步附件')
-                sync_release_assets_only(
-                    gitee_client, github_release_assets, release_tag_name, 
-                    gitee_releases[release_tag_name], gitee_repo)
-                continue
+                # 如果 Gitee 上已存在相同标签的 Release，则只同步变更的信息和附件
+                if release_tag_name in gitee_releases:
+                    tqdm.write(f'Release {release_tag_name} 已存在，仅同步变更的信息和附件')
+                    sync_release_metadata(gitee_client, github_release, gitee_releases[release_tag_name], gitee_repo)
+                    # 详情请求失败（如触发限流）时附件字典为空，此时清理会误删全部附件
+                    if prune_stale_assets and 'assets' in github_release_info:
+                        prune_stale_release_assets(
+                            gitee_client, github_release_assets, gitee_releases[release_tag_name], gitee_repo)
+                    sync_release_assets_only(
+                        gitee_client, github_release_assets, release_tag_name, 
+                        gitee_releases[release_tag_name], gitee_repo, transfer_tuner, scratch_space)
+                    continue
                 
-            tqdm.write(f'成功获取 GitHub Release URL {github_release_url} , 标签为 {github_release_info["tag_name"]}')
+                tqdm.write(f'成功获取 GitHub Release URL {github_release_url} , 标签为 {github_release_info["tag_name"]}')
             
-            # 处理 Release 描述
-            release_body = github_release.get('body', '')
-            if not release_body:
-                # 如果 Release 没有描述，则从对应的 commit 中获取 commit message 作为描述
-                target_commitish = github_release.get('target_commitish', '')
-                if target_commitish:
-                    commit_message, _ = fetch_github_commit_message(github_owner, github_repo, target_commitish)
-                    release_body = commit_message if commit_message else '-'
-                else:
-                    release_body = '-'
+                # 处理 Release 描述
+                release_body = github_release.get('body', '')
+                if not release_body:
+                    # 如果 Release 没有描述，则从对应的 commit 中获取 commit message 作为描述
+                    target_commitish = github_release.get('target_commitish', '')
+                    if target_commitish:
+                        commit_message, _ = fetch_github_commit_message(github_owner, github_repo, target_commitish)
+                        release_body = commit_message if commit_message else '-'
+                    else:
+                        release_body = '-'
             
-            # 在 Gitee 上创建新的 Release
-            gitee_release_id = create_gitee_release(
-                gitee_owner, gitee_token, gitee_repo, release_tag_name,
-                github_release['name'],
-                release_body,
-                github_release['target_commitish'])
+                # 在 Gitee 上创建新的 Release
+                gitee_release_id = create_gitee_release(
+                    gitee_owner, gitee_token, gitee_repo, release_tag_name,
+                    github_release['name'],
+                    release_body,
+                    github_release['target_commitish'],
+                    bool(github_release.get('prerelease')))
                 
-            # 如果创建成功，则同步附件
-            if gitee_release_id is not None:
-                new_release_info = {"assets": [], 'id': gitee_release_id}
-                sync_release_assets_only(
-                    gitee_client, github_release_assets, release_tag_name, 
-                    new_release_info, gitee_repo)
+                # 如果创建成功，则同步附件
+                if gitee_release_id is not None:
+                    new_release_info = {"assets": [], 'id': gitee_release_id}
+                    sync_release_assets_only(
+                        gitee_client, github_release_assets, release_tag_name, 
+                        new_release_info, gitee_repo, transfer_tuner, scratch_space)
+    
+    finally:
+        scratch_space.cleanup()
+        # 保存并输出本次运行学习到的传输参数
+        transfer_tuner.save()
+        tuning_report = transfer_tuner.report()
+        tqdm.write(f"本次运行的传输参数:\n{tuning_report}")
+        set_action_output("transfer-tuning", tuning_report)
+
+
+def normalize_release_metadata(release):
+    """
+    提取并规范化 Release 中参与变更检测的字段
+    
+    Args:
+        release (dict): GitHub 或 Gitee 的 Release 信息
+    
+    Returns:
+        dict: 规范化后的 name、body、prerelease
+    """
+    # target_commitish 不参与对比：标签已存在，且 Gitee 更新接口不支持修改该字段
+    return {
+        'name': (release.get('name') or '').strip(),
+        'body': (release.get('body') or '').replace('\r\n', '\n').strip(),
+        'prerelease': bool(release.get('prerelease')),
+    }
 
 
-def sync_release_assets_only(gitee_client, github_release_assets, release_tag_name, gitee_release_info, gitee_repo):
+def release_metadata_hash(metadata):
+    """
+    计算规范化后 Release 信息的哈希值
+    
+    Args:
+        metadata (dict): normalize_release_metadata 的返回值
+    
+    Returns:
+        str: SHA-256 十六进制摘要
+    """
+    serialized = json.dumps(metadata, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+def sync_release_metadata(gitee_client, github_release, gitee_release_info, gitee_repo):
+    """
+    对比 GitHub 与 Gitee Release 的信息哈希，有变更时只更新变更的字段
+    
+    Args:
+        gitee_client (Gitee): Gitee 客户端实例
+        github_release (dict): GitHub Release 信息
+        gitee_release_info (dict): Gitee Release 信息
+        gitee_repo (str): Gitee 仓库名称
+    
+    Returns:
+        dict: 已更新的字段，无变更或更新失败时为空字典
+    """
+    github_metadata = normalize_release_metadata(github_release)
+    gitee_metadata = normalize_release_metadata(gitee_release_info)
+    # GitHub Release 没有描述时，Gitee 上的描述取自 commit message，不视为变更
+    if not github_metadata['body']:
+        github_metadata['body'] = gitee_metadata['body']
+    # GitHub Release 没有名称时，沿用 Gitee 上的名称，不视为变更
+    if not github_metadata['name']:
+        github_metadata['name'] = gitee_metadata['name'] or github_release['tag_name']
+    
+    if release_metadata_hash(github_metadata) == release_metadata_hash(gitee_metadata):
+        return {}
+    
+    changed_fields = {field: value for field, value in github_metadata.items()
+                      if value != gitee_metadata[field]}
+    tqdm.write(f"Release {github_release['tag_name']} 信息已变更: {', '.join(changed_fields)}")
+    
+    # Gitee 接口要求 name 和 body 必填且不能为空，未变更时沿用 Gitee 上的值
+    request_fields = dict(changed_fields)
+    request_fields['name'] = request_fields.get('name') or gitee_metadata['name'] or github_release['tag_name']
+    request_fields['body'] = request_fields.get('body') or gitee_metadata['body'] or '-'
+    # prerelease 缺省时 Gitee 按 false 处理，未变更时也需带上，避免预览版本被改为正式版本
+    request_fields['prerelease'] = github_metadata['prerelease']
+    success, result = gitee_client.update_release(
+        gitee_repo, gitee_release_info['id'], github_release['tag_name'], request_fields)
+    
+    if not success:
+        logger.error("更新 Release 失败: " + str(result))
+        return {}
+    logger.info(f'更新 Release 成功，Release ID 为 {result}')
+    return changed_fields
+
+
+def prune_stale_release_assets(gitee_client, github_release_assets, gitee_release_info, gitee_repo):
+    """
+    删除 Gitee Release 中 GitHub 上已不存在的附件
+    
+    Args:
+        gitee_client (Gitee): Gitee 客户端实例
+        github_release_assets (dict): GitHub Release 附件字典
+        gitee_release_info (dict): Gitee Release 信息
+        gitee_repo (str): Gitee 仓库名称
+    
+    Returns:
+        list: 已删除的附件名称列表
+    """
+    # 从附件接口获取带 id 的已上传附件，源码压缩包不在其中
+    success, attach_files = gitee_client.list_assets(gitee_repo, gitee_release_info['id'])
+    if not success:
+        logger.error(f"获取 Release {gitee_release_info['id']} 的附件列表失败: {attach_files}")
+        return []
+    
+    pruned_asset_names = []
+    for gitee_asset in attach_files:
+        if gitee_asset.get('name') in github_release_assets:
+            continue
+        success, result = gitee_client.delete_asset(gitee_repo, gitee_release_info['id'], gitee_asset['id'])
+        if success:
+            tqdm.write(f"附件 {gitee_asset['name']} 在 GitHub 上已不存在，已删除")
+            pruned_asset_names.append(gitee_asset['name'])
+        else:
+            logger.error(f"删除附件 {gitee_asset['name']} 失败: {result}")
+    return pruned_asset_names
+
+
+def sync_single_asset(gitee_client, download_url, release_tag_name, github_asset_filename,
+                      gitee_release_id, gitee_repo, transfer_tuner=None, scratch_space=None, asset_size=0):
+    """
+    下载单个 GitHub 附件并上传到 Gitee Release
+    使用临时存储空间时，下载前按附件大小预占空间，上传结束后立即删除文件
+    
+    Args:
+        gitee_client (Gitee): Gitee 客户端实例
+        download_url (str): GitHub 附件下载地址
+        release_tag_name (str): Release 标签名
+        github_asset_filename (str): 附件文件名
+        gitee_release_id (str): Gitee Release ID
+        gitee_repo (str): Gitee 仓库名称
+        transfer_tuner (TransferTuner): 传输参数调节器
+        scratch_space (ScratchSpace): 临时存储空间，为空时下载到当前工作目录且不删除
+        asset_size (int): 附件大小（字节）
+    
+    Returns:
+        list or None: 上传成功的文件下载链接列表，下载失败返回 None
+    """
+    if scratch_space is None:
+        local_directory = f'{release_tag_name}'
+    else:
+        local_directory = scratch_space.directory(release_tag_name)
+        # 预算不足时在此等待其他附件上传完成
+        scratch_space.reserve(asset_size)
+    
+    downloaded_file_path = None
+    try:
+        # 从 GitHub 下载附件
+        downloaded_file_path = download_file_from_url(
+            download_url, local_directory, github_asset_filename, transfer_tuner)
+        
+        # 如果下载失败则跳过
+        if downloaded_file_path is None:
+            return None
+        
+        # 上传附件到 Gitee Release
+        return upload_release_assets(
+            [downloaded_file_path], gitee_client, gitee_repo, gitee_release_id)
+    finally:
+        # 无论上传成功与否都删除文件，避免失败的附件长期占用磁盘
+        if scratch_space is not None:
+            scratch_space.release(
+                downloaded_file_path or os.path.join(local_directory, github_asset_filename), asset_size)
+
+
+def sync_release_assets_only(gitee_client, github_release_assets, release_tag_name, gitee_release_info, gitee_repo,
+                             transfer_tuner=None, scratch_space=None):
     """
     同步 Release 的附件文件
+    附件并发下载上传，同时进行的传输数由调节器根据吞吐量动态调整
     
     Args:
         gitee_client (Gitee): Gitee 客户端实例
@@ -380,6 +594,8 @@ def sync_release_assets_only(gitee_client, github_release_assets, release_tag_na
         release_tag_name (str): Release 标签名
         gitee_release_info (dict): Gitee Release 信息
         gitee_repo (str): Gitee 仓库名称
+        transfer_tuner (TransferTuner): 传输参数调节器，为空时逐个同步
+        scratch_space (ScratchSpace): 附件临时存储空间
     """
     # 构建 Gitee Release 附件字典
     gitee_release_assets = {
@@ -388,8 +604,22 @@ def sync_release_assets_only(gitee_client, github_release_assets, release_tag_na
     
     tqdm.write(f"开始同步 {release_tag_name} 的附件，共 {len(github_release_assets)} 个文件")
     
+    max_workers = transfer_tuner.max_workers if transfer_tuner else 1
+    pending_futures = set()
+    
+    def collect_finished(return_when):
+        """
+        等待进行中的传输结束并输出结果
+        """
+        nonlocal pending_futures
+        finished_futures, pending_futures = wait(pending_futures, return_when=return_when)
+        for finished_future in finished_futures:
+            upload_result = finished_future.result()
+            if upload_result is not None:
+                set_action_output("download-url", upload_result)
+    
     # 遍历 GitHub Release 的每个附件
-    with logging_redirect_tqdm():
+    with logging_redirect_tqdm(), ThreadPoolExecutor(max_workers=max_workers) as executor:
         for github_asset_filename in tqdm(github_release_assets, desc=f"同步 {release_tag_name} 附件", unit="file"):
             # 如果 Gitee 上已存在同名附件，则跳过
             if github_asset_filename in gitee_release_assets:
@@ -402,19 +632,19 @@ def sync_release_assets_only(gitee_client, github_release_assets, release_tag_na
             # 跳过没有下载链接的附件
             if download_url is None:
                 continue
-                
-            # 从 GitHub 下载附件
-            downloaded_file_path = download_file_from_url(
-                download_url, f'{release_tag_name}', github_asset_filename)
-                
-            # 如果下载失败则跳过
-            if downloaded_file_path is None:
-                continue
-                
-            # 上传附件到 Gitee Release
-            upload_result = upload_release_assets(
-                [downloaded_file_path], gitee_client, gitee_repo, gitee_release_info['id'])
-            set_action_output("download-url", upload_result)
+            
+            # 进行中的传输数达到当前并发数时，等待其中一个结束
+            while pending_futures and \
+                    len(pending_futures) >= (transfer_tuner.worker_count() if transfer_tuner else 1):
+                collect_finished(FIRST_COMPLETED)
+            
+            pending_futures.add(executor.submit(
+                sync_single_asset, gitee_client, download_url, release_tag_name, github_asset_filename,
+                gitee_release_info['id'], gitee_repo, transfer_tuner,
+                scratch_space, github_asset_info.get('size', 0)))
+        
+        if pending_futures:
+            collect_finished(ALL_COMPLETED)
 
 
 if __name__ == '__main__':
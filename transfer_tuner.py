@@ -0,0 +1,331 @@
+#!/usr/bin/env python
+# coding:utf-8
+"""
+传输参数自适应调节模块
+在同步过程中测量所有进行中传输的总吞吐量，按 AIMD（加性增、乘性减）策略分别调整
+下载/上传的缓冲区大小和并发数，并将学习到的参数保存供下次运行使用
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+# 参数默认值与上下限
+DEFAULT_CHUNK_SIZE = 64 * 1024
+MIN_CHUNK_SIZE = 8 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+CHUNK_SIZE_STEP = 64 * 1024
+DEFAULT_WORKERS = 1
+DEFAULT_MAX_WORKERS = 4
+# 总吞吐量低于平均值的该比例时视为拥塞
+CONGESTION_RATIO = 0.7
+# 吞吐量指数滑动平均的权重
+EWMA_WEIGHT = 0.3
+# 传输方向
+DIRECTIONS = ('download', 'upload')
+
+logger = logging.getLogger(__name__)
+
+
+class TransferTuner:
+    """
+    传输参数调节器
+    每次传输结束后调用 record 上报测量结果，调节器据此调整分块大小和并发数
+    """
+
+    def __init__(self, state_file=None, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        初始化调节器，若状态文件存在则加载上次运行学习到的参数
+
+        Args:
+            state_file (str): 参数保存路径，为空时不持久化
+            max_workers (int): 并发数上限
+        """
+        self.state_file = state_file
+        self.max_workers = max(1, max_workers)
+        self.workers = DEFAULT_WORKERS
+        self.chunk_sizes = {direction: DEFAULT_CHUNK_SIZE for direction in DIRECTIONS}
+        self.throughputs = {direction: None for direction in DIRECTIONS}
+        self.transferred_bytes = {direction: 0 for direction in DIRECTIONS}
+        self.active_transfers = {direction: 0 for direction in DIRECTIONS}
+        # 并发数对时间的累积积分，用于计算任意时段内的时间加权平均并发数
+        self.active_integrals = {direction: 0.0 for direction in DIRECTIONS}
+        self.active_changed_at = {direction: time.monotonic() for direction in DIRECTIONS}
+        # 本次运行是否已有自己的吞吐量样本，上次运行保存的平均值只用于展示，不作为拥塞判断基准
+        self.measured = {direction: False for direction in DIRECTIONS}
+        self.failures = 0
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """
+        从状态文件加载参数，文件不存在或内容无效时保持默认值
+        """
+        if not self.state_file or not os.path.isfile(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as state_handle:
+                state = json.load(state_handle)
+            self.workers = _clamp(int(state.get('workers', self.workers)), 1, self.max_workers)
+            for direction in DIRECTIONS:
+                saved = state.get(direction, {})
+                if 'chunk_size' in saved:
+                    self.chunk_sizes[direction] = _clamp(
+                        int(saved['chunk_size']), MIN_CHUNK_SIZE, MAX_CHUNK_SIZE)
+                if saved.get('throughput'):
+                    self.throughputs[direction] = float(saved['throughput'])
+            logger.info('已加载传输参数: %s', self.state_file)
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            logger.warning('传输参数文件 %s 无效，使用默认值: %s', self.state_file, e)
+
+    def save(self):
+        """
+        将当前参数保存到状态文件
+        """
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file, 'w', encoding='utf-8') as state_handle:
+                json.dump(self.snapshot(), state_handle, indent=2)
+        except OSError as e:
+            logger.warning('保存传输参数失败: %s', e)
+
+    def chunk_size(self, direction):
+        """
+        获取指定方向当前的分块大小
+
+        Args:
+            direction (str): 传输方向，download 或 upload
+
+        Returns:
+            int: 分块大小（字节）
+        """
+        with self._lock:
+            return self.chunk_sizes[direction]
+
+    def worker_count(self):
+        """
+        获取当前的并发数
+
+        Returns:
+            int: 并发数
+        """
+        with self._lock:
+            return self.workers
+
+    def begin(self, direction):
+        """
+        开始一次传输的测量，传输结束后须调用返回对象的 finish、fail 或 close
+
+        Args:
+            direction (str): 传输方向，download 或 upload
+
+        Returns:
+            TransferMeasurement: 本次传输的测量对象
+        """
+        with self._lock:
+            self._accumulate(direction)
+            self.active_transfers[direction] += 1
+            return TransferMeasurement(
+                self, direction, self.active_transfers[direction], self.active_integrals[direction])
+
+    def _end(self, direction):
+        """
+        结束一次传输
+
+        Returns:
+            tuple: (结束前同时进行的传输数, 当前并发数积分)
+        """
+        with self._lock:
+            self._accumulate(direction)
+            concurrency = self.active_transfers[direction]
+            self.active_transfers[direction] = max(concurrency - 1, 0)
+            return concurrency, self.active_integrals[direction]
+
+    def _accumulate(self, direction):
+        """
+        将上次变化以来的并发数累加到积分中，调用方需持有锁
+        """
+        now = time.monotonic()
+        self.active_integrals[direction] += self.active_transfers[direction] * (now - self.active_changed_at[direction])
+        self.active_changed_at[direction] = now
+
+    def record(self, direction, size, seconds, success=True, concurrency=1, concurrency_rose=False):
+        """
+        上报一次传输的测量结果并调整参数
+        单个连接的吞吐量乘以传输期间的时间加权平均并发数，近似为所有进行中传输的总吞吐量，
+        避免增加并发后单连接吞吐量下降被误判为拥塞
+
+        并发数：总吞吐量未明显下降时加 1，失败或明显下降时减半
+        分块大小：总吞吐量不低于平均值时增加一个步长，明显下降且期间并发数未增加时减半，失败时不变
+
+        Args:
+            direction (str): 传输方向，download 或 upload
+            size (int): 传输字节数
+            seconds (float): 传输耗时（秒）
+            success (bool): 传输是否成功
+            concurrency (float): 传输期间的平均并发数
+            concurrency_rose (bool): 传输期间并发数是否增加
+        """
+        with self._lock:
+            if not success:
+                self.failures += 1
+                self.workers = max(self.workers // 2, 1)
+                return
+            self.transferred_bytes[direction] += size
+            # 过小或过快的传输无法反映连接吞吐量，不参与调整
+            if size < self.chunk_sizes[direction] or seconds <= 0:
+                return
+            throughput = size / seconds * max(concurrency, 1)
+            if not self.measured[direction]:
+                # 本次运行的第一个样本直接作为基准，不与上次运行的平均值比较
+                self.measured[direction] = True
+                self.throughputs[direction] = throughput
+                self._increase_workers()
+                self._increase_chunk_size(direction)
+            else:
+                average = self.throughputs[direction]
+                if throughput < average * CONGESTION_RATIO:
+                    # 吞吐量下降伴随并发数增加时，只回退并发数，不归咎于分块大小
+                    if not concurrency_rose:
+                        self._decrease_chunk_size(direction)
+                    self.workers = max(self.workers // 2, 1)
+                else:
+                    self._increase_workers()
+                    if throughput >= average:
+                        self._increase_chunk_size(direction)
+                self.throughputs[direction] = average * (1 - EWMA_WEIGHT) + throughput * EWMA_WEIGHT
+
+    def _increase_workers(self):
+        """
+        加性增加并发数
+        """
+        self.workers = min(self.workers + 1, self.max_workers)
+
+    def _increase_chunk_size(self, direction):
+        """
+        加性增加分块大小
+        """
+        self.chunk_sizes[direction] = min(self.chunk_sizes[direction] + CHUNK_SIZE_STEP, MAX_CHUNK_SIZE)
+
+    def _decrease_chunk_size(self, direction):
+        """
+        乘性减小分块大小
+        """
+        self.chunk_sizes[direction] = max(self.chunk_sizes[direction] // 2, MIN_CHUNK_SIZE)
+
+    def snapshot(self):
+        """
+        获取当前参数快照
+
+        Returns:
+            dict: 并发数及各方向的分块大小、平均吞吐量
+        """
+        state = {'workers': self.workers}
+        for direction in DIRECTIONS:
+            state[direction] = {
+                'chunk_size': self.chunk_sizes[direction],
+                'throughput': round(self.throughputs[direction] or 0, 2),
+            }
+        return state
+
+    def report(self):
+        """
+        生成本次运行的参数报告
+
+        Returns:
+            str: 报告文本
+        """
+        with self._lock:
+            lines = [f'并发数: {self.workers} (上限 {self.max_workers}), 失败次数: {self.failures}']
+            for direction in DIRECTIONS:
+                throughput = self.throughputs[direction] or 0
+                lines.append(f'{direction}: 分块 {self.chunk_sizes[direction] // 1024} KiB, '
+                             f'平均吞吐 {throughput / 1024:.1f} KiB/s, '
+                             f'共传输 {self.transferred_bytes[direction]} 字节')
+            return '\n'.join(lines)
+
+
+class TransferMeasurement:
+    """
+    单次传输的测量对象
+    记录开始时间、开始时的并发数和并发数积分，结束时以时间加权平均并发数上报调节器
+    """
+
+    def __init__(self, tuner, direction, concurrency_at_start, integral_at_start):
+        """
+        Args:
+            tuner (TransferTuner): 所属调节器
+            direction (str): 传输方向，download 或 upload
+            concurrency_at_start (int): 开始时同时进行的传输数（含本次）
+            integral_at_start (float): 开始时的并发数积分
+        """
+        self.tuner = tuner
+        self.direction = direction
+        self.concurrency_at_start = concurrency_at_start
+        self.integral_at_start = integral_at_start
+        self.start_time = time.monotonic()
+        self.closed = False
+
+    def close(self):
+        """
+        结束测量但不上报结果，用于与吞吐量无关的错误；重复调用无副作用
+
+        Returns:
+            tuple: (传输期间的时间加权平均并发数, 传输期间并发数是否增加)
+        """
+        if self.closed:
+            return self.concurrency_at_start, False
+        self.closed = True
+        seconds = time.monotonic() - self.start_time
+        concurrency_at_end, integral_at_end = self.tuner._end(self.direction)
+        concurrency = (integral_at_end - self.integral_at_start) / seconds if seconds > 0 \
+            else self.concurrency_at_start
+        return concurrency, concurrency_at_end > self.concurrency_at_start
+
+    def finish(self, size):
+        """
+        上报一次成功的传输
+
+        Args:
+            size (int): 传输字节数
+        """
+        if self.closed:
+            return
+        seconds = time.monotonic() - self.start_time
+        concurrency, concurrency_rose = self.close()
+        self.tuner.record(self.direction, size, seconds,
+                          concurrency=concurrency, concurrency_rose=concurrency_rose)
+
+    def fail(self):
+        """
+        上报一次因网络错误或服务端过载失败的传输
+        """
+        if self.closed:
+            return
+        seconds = time.monotonic() - self.start_time
+        self.close()
+        self.tuner.record(self.direction, 0, seconds, success=False)
+
+
+def is_congestion_status(status_code):
+    """
+    判断 HTTP 状态码是否反映服务端过载或限流
+    404、410 等客户端错误与吞吐量无关，不应触发参数下调
+
+    Args:
+        status_code (int): HTTP 状态码
+
+    Returns:
+        bool: 5xx 或 429 时返回 True
+    """
+    return status_code == 429 or status_code >= 500
+
+
+def _clamp(value, lower, upper):
+    """
+    将数值限制在指定区间内
+    """
+    return max(lower, min(value, upper))